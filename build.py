@@ -5,14 +5,17 @@ import panda3d.core  # noqa
 
 import sys
 import os
+import time
 import argparse
 from os.path import join, realpath, dirname
 
 # Change into the current directory
 os.chdir(dirname(realpath(__file__)))
 
-from scripts.common import get_ini_conf, write_ini_conf  # noqa
-from scripts.setup import make_output_dir, run_cmake, run_cmake_build
+from scripts.common import get_ini_conf, write_ini_conf, try_remove, TIMINGS_FILE  # noqa
+from scripts.setup import make_output_dir, run_cmake, run_cmake_build, print_build_timings
+from scripts.setup import run_cpp_bench
+from scripts.workspace import is_workspace, build_workspace
 
 if __name__ == "__main__":
 
@@ -23,6 +26,15 @@ if __name__ == "__main__":
         help="Optimize level, should match the one used for the Panda3D build",)
     parser.add_argument(
         "--clean", action="store_true", help="Forces a clean rebuild")
+    parser.add_argument(
+        "--memprofile", action="store_true",
+        help="Builds the memory profiling variant of the module into memprofile/")
+    parser.add_argument(
+        "--run-cpp-bench", action="store_true",
+        help="Runs the native benchmarks from bench/ after building")
+    parser.add_argument(
+        "--cpp-bench-output", default="bench_results.json",
+        help="File to write the native benchmark results to")
     args = parser.parse_args()
 
     # Python 2 compatibility
@@ -32,8 +44,8 @@ if __name__ == "__main__":
     config_file = join(dirname(realpath(__file__)), "config.ini")
     config = get_ini_conf(config_file)
 
-    # Find cached module name
-    if "module_name" not in config or not config["module_name"]:
+    # Find cached module name, workspaces list their modules instead
+    if not is_workspace(config) and ("module_name" not in config or not config["module_name"]):
         module_name = str(raw_input("Enter a module name: "))
         config["module_name"] = module_name.strip()
 
@@ -46,10 +58,29 @@ if __name__ == "__main__":
     # Write back config
     write_ini_conf(config, config_file)
 
+    # Workspaces build each module in its own subfolder of the output dir
+    if is_workspace(config):
+        if args.run_cpp_bench:
+            print("WARNING: Native benchmarks are not supported for workspace builds")
+        make_output_dir(memprofile=args.memprofile)
+        build_workspace(config, args)
+        print("Success!")
+        sys.exit(0)
+
     # Just execute the build script
-    make_output_dir(clean=args.clean)
+    make_output_dir(clean=args.clean, memprofile=args.memprofile)
+    try_remove(TIMINGS_FILE)
+
+    configure_start = time.time()
     run_cmake(config, args)
+    build_start = time.time()
     run_cmake_build(config, args)
+    build_end = time.time()
+
+    print_build_timings(build_start - configure_start, build_start, build_end)
+
+    if args.run_cpp_bench:
+        run_cpp_bench(config, args, join(dirname(realpath(__file__)), args.cpp_bench_output))
 
     print("Success!")
     sys.exit(0)
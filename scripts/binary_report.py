@@ -0,0 +1,114 @@
+"""
+
+Prints size information about the generated module binary. For ELF files
+this includes the number of relocations and exported symbols, which
+determine how long the dynamic loader needs to load the module.
+
+"""
+
+from __future__ import print_function
+
+import struct
+from os.path import getsize, basename
+
+from common import debug_out
+
+# ELF section types
+SHT_SYMTAB = 2
+SHT_RELA = 4
+SHT_REL = 9
+SHT_DYNSYM = 11
+
+# ELF symbol bindings
+STB_GLOBAL = 1
+STB_WEAK = 2
+
+
+class ELFInfo(object):
+    """ Minimal ELF reader, only reads the section headers and the dynamic
+    symbol table """
+
+    def __init__(self, data):
+        self.data = data
+        self.is_64 = data[4:5] == b"\x02"
+        self.endian = "<" if data[5:6] == b"\x01" else ">"
+        self.sections = self._read_sections()
+
+    def _unpack(self, fmt, offset):
+        return struct.unpack_from(self.endian + fmt, self.data, offset)
+
+    def _read_sections(self):
+        if self.is_64:
+            shoff, = self._unpack("Q", 0x28)
+            shentsize, shnum, shstrndx = self._unpack("HHH", 0x3A)
+            fmt = "IIQQQQIIQQ"
+        else:
+            shoff, = self._unpack("I", 0x20)
+            shentsize, shnum, shstrndx = self._unpack("HHH", 0x2E)
+            fmt = "IIIIIIIIII"
+
+        sections = []
+        for i in range(shnum):
+            (name, stype, _, _, offset, size, link, _, _, entsize) = self._unpack(fmt, shoff + i * shentsize)
+            sections.append({"name": name, "type": stype, "offset": offset,
+                             "size": size, "link": link, "entsize": entsize})
+
+        # Resolve the section names
+        if shstrndx < len(sections):
+            strtab = sections[shstrndx]
+            for section in sections:
+                section["name"] = self._read_str(strtab["offset"] + section["name"])
+        return sections
+
+    def _read_str(self, offset):
+        end = self.data.find(b"\x00", offset)
+        return self.data[offset:end].decode("ascii", "ignore")
+
+    def get_section_size(self, name):
+        """ Returns the size of the section with the given name, or 0 """
+        return sum(i["size"] for i in self.sections if i["name"] == name)
+
+    def has_debug_info(self):
+        """ Returns whether the binary contains dwarf debug information """
+        return any(i["name"].startswith(".debug_") for i in self.sections)
+
+    def get_num_relocations(self):
+        """ Returns the amount of relocations the loader has to process """
+        return sum(i["size"] // i["entsize"] for i in self.sections
+                   if i["type"] in [SHT_REL, SHT_RELA] and i["entsize"])
+
+    def get_num_exported_symbols(self):
+        """ Returns the amount of defined global symbols in the dynamic symbol table """
+        count = 0
+        for section in self.sections:
+            if section["type"] != SHT_DYNSYM or not section["entsize"]:
+                continue
+            for i in range(section["size"] // section["entsize"]):
+                offset = section["offset"] + i * section["entsize"]
+                if self.is_64:
+                    _, info, _, shndx = self._unpack("IBBH", offset)
+                else:
+                    _, _, _, info, _, shndx = self._unpack("IIIBBH", offset)
+                if shndx != 0 and (info >> 4) in [STB_GLOBAL, STB_WEAK]:
+                    count += 1
+        return count
+
+
+def print_binary_report(fname):
+    """ Prints the size of the given binary, and for ELF binaries the
+    relocation and symbol counts """
+    with open(fname, "rb") as handle:
+        data = handle.read()
+
+    debug_out("\nBinary report for", basename(fname) + ":")
+    debug_out("  {:<24}{:>12}".format("File size (bytes)", getsize(fname)))
+
+    if data[:4] != b"\x7fELF":
+        return
+
+    elf = ELFInfo(data)
+    debug_out("  {:<24}{:>12}".format(".text (bytes)", elf.get_section_size(".text")))
+    debug_out("  {:<24}{:>12}".format(".data.rel.ro (bytes)", elf.get_section_size(".data.rel.ro")))
+    debug_out("  {:<24}{:>12}".format("Relocations", elf.get_num_relocations()))
+    debug_out("  {:<24}{:>12}".format("Exported symbols", elf.get_num_exported_symbols()))
+    debug_out("  {:<24}{:>12}".format("Debug info", "yes" if elf.has_debug_info() else "no"))
@@ -0,0 +1,92 @@
+
+#include "binding_stats.h"
+
+#include "configVariableBool.h"
+
+const char *const *BindingStats::_names = nullptr;
+int BindingStats::_num_bindings = 0;
+AtomicAdjust::Integer *BindingStats::_call_counts = nullptr;
+PStatCollector **BindingStats::_collectors = nullptr;
+bool BindingStats::_pstats_enabled = true;
+
+/**
+ * Called from the generated wrapper during static initialization, with the
+ * names of all instrumented bindings.
+ */
+void BindingStats::
+register_bindings(const char *const *names, int num_bindings) {
+  _names = names;
+  _num_bindings = num_bindings;
+  _call_counts = new AtomicAdjust::Integer[num_bindings];
+  // PStatCollector has no public default constructor when DO_PSTATS is
+  // defined, so the collectors are allocated one by one
+  _collectors = new PStatCollector *[num_bindings];
+  for (int i = 0; i < num_bindings; ++i) {
+    _call_counts[i] = 0;
+    _collectors[i] = new PStatCollector(names[i]);
+  }
+}
+
+void BindingStats::
+set_pstats_enabled(bool enabled) {
+  _pstats_enabled = enabled;
+}
+
+int BindingStats::
+get_num_bindings() {
+  return _num_bindings;
+}
+
+const char *BindingStats::
+get_name(int index) {
+  nassertr(index >= 0 && index < _num_bindings, "");
+  return _names[index];
+}
+
+long long BindingStats::
+get_call_count(int index) {
+  nassertr(index >= 0 && index < _num_bindings, 0);
+  return (long long)AtomicAdjust::get(_call_counts[index]);
+}
+
+void BindingStats::
+reset_call_counts() {
+  for (int i = 0; i < _num_bindings; ++i) {
+    AtomicAdjust::set(_call_counts[i], 0);
+  }
+}
+
+/**
+ * Called from init_libmymodule(). The PStats collectors can be switched off
+ * at runtime with binding-stats-pstats, in which case only the calls are
+ * counted.
+ */
+void
+init_binding_stats() {
+  static ConfigVariableBool binding_stats_pstats
+    ("binding-stats-pstats", true,
+     PRC_DESC("Set this to false to only count the calls into the python "
+              "bindings of the module, without opening a PStats collector "
+              "for each call."));
+  BindingStats::set_pstats_enabled(binding_stats_pstats);
+}
+
+int
+get_num_bindings() {
+  return BindingStats::get_num_bindings();
+}
+
+std::string
+get_binding_name(int index) {
+  return BindingStats::get_name(index);
+}
+
+long long
+get_binding_call_count(int index) {
+  return BindingStats::get_call_count(index);
+}
+
+void
+reset_binding_call_counts() {
+  BindingStats::reset_call_counts();
+}
@@ -0,0 +1,72 @@
+#pragma once
+
+// Instrumentation of the generated python bindings. This is only compiled in
+// when instrument_bindings=1 is set in the config.ini.
+//
+// interrogate.py inserts a PB_BINDING_SCOPE into every generated wrapper
+// function, which counts the calls and opens a PStats collector for the
+// duration of the call. The call counts can be queried from python.
+
+#include "pandabase.h"
+#include "pStatCollector.h"
+#include "atomicAdjust.h"
+
+#include <string>
+
+#ifndef CPPPARSER
+class BindingStats {
+public:
+  static void register_bindings(const char *const *names, int num_bindings);
+  static void set_pstats_enabled(bool enabled);
+
+  static int get_num_bindings();
+  static const char *get_name(int index);
+  static long long get_call_count(int index);
+  static void reset_call_counts();
+
+  inline static PStatCollector *enter(int index);
+
+private:
+  static const char *const *_names;
+  static int _num_bindings;
+  static AtomicAdjust::Integer *_call_counts;
+  static PStatCollector **_collectors;
+  static bool _pstats_enabled;
+};
+
+class BindingScope {
+public:
+  inline BindingScope(int index) : _collector(BindingStats::enter(index)) {
+    if (_collector != nullptr) {
+      _collector->start();
+    }
+  }
+  inline ~BindingScope() {
+    if (_collector != nullptr) {
+      _collector->stop();
+    }
+  }
+
+private:
+  PStatCollector *_collector;
+};
+
+inline PStatCollector *BindingStats::
+enter(int index) {
+  AtomicAdjust::inc(_call_counts[index]);
+  return _pstats_enabled ? _collectors[index] : nullptr;
+}
+
+#define PB_BINDING_SCOPE(index) BindingScope pb_binding_scope(index)
+#endif
+
+extern void init_binding_stats();
+
+BEGIN_PUBLISH
+
+int get_num_bindings();
+std::string get_binding_name(int index);
+long long get_binding_call_count(int index);
+void reset_binding_call_counts();
+
+END_PUBLISH
@@ -12,7 +12,7 @@ import subprocess
 import platform
 
 from os.path import dirname, realpath, join, isdir, isfile
-from os import makedirs
+from os import makedirs, remove
 from sys import argv, stdout, stderr, exit
 from panda3d.core import PandaSystem, Filename, ExecutionEnvironment
 
@@ -58,17 +58,19 @@ MSVC_VERSIONS = [
     MSVCVersion(1931, "Visual Studio 17 2022", "vc143")
 ]
 
-def get_output_name():
-    """ Returns the name of the output dir, depending on the system architecture """
+def get_output_name(memprofile=False):
+    """ Returns the name of the output dir, depending on the system architecture.
+    The memory profiling build gets its own output dir """
     compiler_suffix = ""
     if is_windows():
         compiler_suffix = "_" + get_panda_msvc_version().suffix
 
     version_suffix = "panda" + PandaSystem.get_version_string()
+    flavor_suffix = "_memprofile" if memprofile else ""
 
-    return PandaSystem.getPlatform().lower() + "_{}_py{}{}{}".format(
+    return PandaSystem.getPlatform().lower() + "_{}_py{}{}{}{}".format(
         version_suffix, sys.version_info.major,
-        sys.version_info.minor, compiler_suffix)
+        sys.version_info.minor, compiler_suffix, flavor_suffix)
 
 
 def get_script_dir():
@@ -81,9 +83,9 @@ def get_basepath():
     return join(get_script_dir(), "..")
 
 
-def get_output_dir():
+def get_output_dir(memprofile=False):
     """ Returns the output directory where CMake generates the build files into """
-    return realpath(join(get_basepath(), get_output_name()))
+    return realpath(join(get_basepath(), get_output_name(memprofile)))
 
 
 def get_python_dir():
@@ -254,14 +256,23 @@ def try_makedir(dirname):
         pass
 
 
+def try_remove(fname):
+    """ Tries to remove the specified file, but in case it fails it does nothing """
+    try:
+        remove(fname)
+    except:
+        pass
+
+
 def try_execute(*args, **kwargs):
     """ Tries to execute the given process, if everything wents good, it just
     returns, otherwise it prints the output to stderr and exits with a nonzero
     status code """
     error_formatter = kwargs.get("error_formatter", None) # Fix for Py < 3
+    cwd = kwargs.get("cwd", None)
     debug_out("Executing command: ", ' '.join(args), "\n")
     try:
-        process = subprocess.Popen(args, shell=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        process = subprocess.Popen(args, shell=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=cwd)
         line = process.stdout.readline()
         output = line
         while line:
@@ -303,6 +314,40 @@ def write_ini_conf(config, fname):
     with open(fname, "w") as handle:
         handle.write(''.join("{}={}\n".format(k, v) for k, v in sorted(config.items())))
 
+
+# Name of the file the build steps write their timings to, relative to the output dir
+TIMINGS_FILE = "build_timings.txt"
+
+
+def record_timing(fname, name, start, end):
+    """ Appends a build step with its absolute start and end time to the
+    timings file, so build.py can reconstruct the critical path later on """
+    with open(fname, "a") as handle:
+        handle.write("{}={:.3f},{:.3f}\n".format(name, start, end))
+
+
+def read_timing_spans(fname):
+    """ Reads back the steps written by record_timing, returns a list of
+    (name, start, end). Steps like compile occur multiple times """
+    if not isfile(fname):
+        return []
+    spans = []
+    with open(fname, "r") as handle:
+        for line in handle.readlines():
+            if "=" not in line:
+                continue
+            name, span = line.strip().split("=", 1)
+            start, end = span.split(",")
+            spans.append((name, float(start), float(end)))
+    return spans
+
+
+def read_timings(fname):
+    """ Reads back the steps written by record_timing, returns a dict of
+    step name to (start, end) """
+    return {name: (start, end) for name, start, end in read_timing_spans(fname)}
+
+
 def get_panda_msvc_version():
     """ Returns the MSVC version panda was built with """
     compiler = PandaSystem.get_compiler()
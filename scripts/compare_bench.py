@@ -0,0 +1,41 @@
+"""
+
+Compares two result files written by build.py --run-cpp-bench, e.g. from
+two different commits.
+
+"""
+
+from __future__ import print_function
+
+import sys
+import json
+
+if len(sys.argv) != 3:
+    print("Usage: python compare_bench.py <old-results.json> <new-results.json>")
+    sys.exit(1)
+
+
+def load_results(fname):
+    """ Returns a dict of benchmark name to result """
+    with open(fname, "r") as handle:
+        return {i["name"]: i for i in json.load(handle)["benchmarks"]}
+
+
+if __name__ == "__main__":
+
+    old_results = load_results(sys.argv[1])
+    new_results = load_results(sys.argv[2])
+
+    print("{:<40}{:>14}{:>14}{:>10}".format("Benchmark", "old (ns)", "new (ns)", "change"))
+    for name in sorted(set(old_results) | set(new_results)):
+        if name not in old_results or name not in new_results:
+            status = "added" if name in new_results else "removed"
+            print("{:<40}{:>38}".format(name, status))
+            continue
+
+        old_ns = old_results[name]["median_ns"]
+        new_ns = new_results[name]["median_ns"]
+        change = (new_ns - old_ns) / old_ns * 100.0 if old_ns > 0 else 0.0
+        print("{:<40}{:>14.2f}{:>14.2f}{:>9.1f}%".format(name, old_ns, new_ns, change))
+
+    sys.exit(0)
@@ -0,0 +1,182 @@
+
+#include "pb_bench.h"
+
+#include "trueClock.h"
+
+#include <algorithm>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+
+#define PB_STRINGIFY_IMPL(x) #x
+#define PB_STRINGIFY(x) PB_STRINGIFY_IMPL(x)
+
+struct BenchOptions {
+  int warmup;
+  int repetitions;
+  double min_rep_time;
+  const char *filter;
+  const char *json_file;
+};
+
+struct BenchResult {
+  std::string name;
+  long iterations;
+  int repetitions;
+  double min_ns;
+  double max_ns;
+  double mean_ns;
+  double median_ns;
+  double stddev_ns;
+};
+
+BenchRegistry *BenchRegistry::
+get_global_ptr() {
+  static BenchRegistry registry;
+  return &registry;
+}
+
+void BenchRegistry::
+register_bench(const std::string &name, BenchFunc func) {
+  BenchEntry entry;
+  entry.name = name;
+  entry.func = func;
+  _benchmarks.push_back(entry);
+}
+
+const std::vector<BenchEntry> &BenchRegistry::
+get_benchmarks() const {
+  return _benchmarks;
+}
+
+// Runs the benchmark the given amount of iterations, returns the elapsed time in seconds
+static double
+time_iterations(BenchFunc func, long iterations) {
+  TrueClock *clock = TrueClock::get_global_ptr();
+  double start = clock->get_short_time();
+  for (long i = 0; i < iterations; ++i) {
+    func();
+  }
+  return clock->get_short_time() - start;
+}
+
+static BenchResult
+run_benchmark(const BenchEntry &entry, const BenchOptions &options) {
+  // Find an iteration count so a single repetition takes long enough to be
+  // measurable with the clock resolution
+  long iterations = 1;
+  while (time_iterations(entry.func, iterations) < options.min_rep_time && iterations < (1L << 30)) {
+    iterations *= 2;
+  }
+
+  for (int i = 0; i < options.warmup; ++i) {
+    time_iterations(entry.func, iterations);
+  }
+
+  std::vector<double> samples;
+  for (int i = 0; i < options.repetitions; ++i) {
+    samples.push_back(time_iterations(entry.func, iterations) * 1e9 / iterations);
+  }
+  std::sort(samples.begin(), samples.end());
+
+  double sum = 0.0;
+  for (size_t i = 0; i < samples.size(); ++i) {
+    sum += samples[i];
+  }
+  double mean = sum / samples.size();
+
+  double variance = 0.0;
+  for (size_t i = 0; i < samples.size(); ++i) {
+    variance += (samples[i] - mean) * (samples[i] - mean);
+  }
+  if (samples.size() > 1) {
+    variance /= samples.size() - 1;
+  }
+
+  size_t mid = samples.size() / 2;
+  double median = samples.size() % 2 ? samples[mid] : 0.5 * (samples[mid - 1] + samples[mid]);
+
+  BenchResult result;
+  result.name = entry.name;
+  result.iterations = iterations;
+  result.repetitions = options.repetitions;
+  result.min_ns = samples.front();
+  result.max_ns = samples.back();
+  result.mean_ns = mean;
+  result.median_ns = median;
+  result.stddev_ns = sqrt(variance);
+  return result;
+}
+
+static bool
+write_json(const char *filename, const std::vector<BenchResult> &results) {
+  FILE *handle = fopen(filename, "w");
+  if (handle == nullptr) {
+    return false;
+  }
+
+  fprintf(handle, "{\n  \"module\": \"%s\",\n  \"benchmarks\": [", PB_STRINGIFY(PB_MODULE));
+  for (size_t i = 0; i < results.size(); ++i) {
+    const BenchResult &r = results[i];
+    fprintf(handle, "%s\n    {\"name\": \"%s\", \"iterations\": %ld, \"repetitions\": %d, "
+                    "\"min_ns\": %.3f, \"max_ns\": %.3f, \"mean_ns\": %.3f, "
+                    "\"median_ns\": %.3f, \"stddev_ns\": %.3f}",
+            i > 0 ? "," : "", r.name.c_str(), r.iterations, r.repetitions,
+            r.min_ns, r.max_ns, r.mean_ns, r.median_ns, r.stddev_ns);
+  }
+  fprintf(handle, "\n  ]\n}\n");
+  fclose(handle);
+  return true;
+}
+
+int
+main(int argc, char *argv[]) {
+  BenchOptions options;
+  options.warmup = 3;
+  options.repetitions = 10;
+  options.min_rep_time = 0.01;
+  options.filter = nullptr;
+  options.json_file = nullptr;
+
+  for (int i = 1; i < argc; ++i) {
+    if (strcmp(argv[i], "--warmup") == 0 && i + 1 < argc) {
+      options.warmup = atoi(argv[++i]);
+    } else if (strcmp(argv[i], "--repetitions") == 0 && i + 1 < argc) {
+      options.repetitions = std::max(1, atoi(argv[++i]));
+    } else if (strcmp(argv[i], "--min-time") == 0 && i + 1 < argc) {
+      options.min_rep_time = atof(argv[++i]);
+    } else if (strcmp(argv[i], "--filter") == 0 && i + 1 < argc) {
+      options.filter = argv[++i];
+    } else if (strcmp(argv[i], "--json") == 0 && i + 1 < argc) {
+      options.json_file = argv[++i];
+    } else {
+      fprintf(stderr, "Usage: %s [--warmup N] [--repetitions N] [--min-time SECONDS] "
+                      "[--filter SUBSTRING] [--json FILE]\n", argv[0]);
+      return 1;
+    }
+  }
+
+  std::vector<BenchResult> results;
+  const std::vector<BenchEntry> &benchmarks = BenchRegistry::get_global_ptr()->get_benchmarks();
+  for (size_t i = 0; i < benchmarks.size(); ++i) {
+    const BenchEntry &entry = benchmarks[i];
+    if (options.filter != nullptr && entry.name.find(options.filter) == std::string::npos) {
+      continue;
+    }
+
+    BenchResult result = run_benchmark(entry, options);
+    printf("%-40s %12.2f ns (median) %12.2f ns (min) +- %8.2f ns, %ld iterations\n",
+           result.name.c_str(), result.median_ns, result.min_ns, result.stddev_ns,
+           result.iterations);
+    results.push_back(result);
+  }
+
+  if (options.json_file != nullptr) {
+    if (!write_json(options.json_file, results)) {
+      fprintf(stderr, "Failed to write %s\n", options.json_file);
+      return 1;
+    }
+  }
+  return 0;
+}
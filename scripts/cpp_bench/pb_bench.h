@@ -0,0 +1,65 @@
+#pragma once
+
+// Small benchmark harness for the C++ parts of a module. Benchmarks are
+// placed in bench/*.cpp and get linked together with the module sources
+// into a seperate executable, so they run without any Python overhead.
+//
+// Example:
+//
+//   #include "pb_bench.h"
+//   #include "example.h"
+//
+//   PB_BENCHMARK(multiply) {
+//     pb_bench_keep(multiply(3, 4));
+//   }
+//
+// The body is one iteration. The harness calibrates the number of
+// iterations per repetition, runs a few warmup repetitions and then
+// reports statistics over the timed repetitions.
+
+#include "pandabase.h"
+
+#include <string>
+#include <vector>
+
+typedef void (*BenchFunc)();
+
+struct BenchEntry {
+  std::string name;
+  BenchFunc func;
+};
+
+class BenchRegistry {
+public:
+  static BenchRegistry *get_global_ptr();
+
+  void register_bench(const std::string &name, BenchFunc func);
+  const std::vector<BenchEntry> &get_benchmarks() const;
+
+private:
+  std::vector<BenchEntry> _benchmarks;
+};
+
+class BenchRegistrar {
+public:
+  inline BenchRegistrar(const char *name, BenchFunc func) {
+    BenchRegistry::get_global_ptr()->register_bench(name, func);
+  }
+};
+
+// Prevents the compiler from optimizing away a computed value
+template<class T>
+inline void
+pb_bench_keep(const T &value) {
+#ifdef _MSC_VER
+  volatile char sink = *(const volatile char *)&value;
+  (void)sink;
+#else
+  asm volatile("" : : "r,m"(value) : "memory");
+#endif
+}
+
+#define PB_BENCHMARK(name) \
+  static void pb_bench_##name(); \
+  static BenchRegistrar pb_bench_registrar_##name(#name, &pb_bench_##name); \
+  static void pb_bench_##name()
@@ -3,13 +3,23 @@
 import panda3d.core  # noqa
 
 import sys
+import time
 
 from shutil import copyfile
 from os.path import isfile, join
-from common import is_windows, get_output_dir, fatal_error, get_script_dir
+from common import is_windows, is_macos, get_output_dir, fatal_error, get_script_dir
+from common import try_execute, try_remove, try_makedir, print_error
+from common import record_timing, TIMINGS_FILE
+from binary_report import print_binary_report, ELFInfo
 
+try:
+    from shutil import which
+except ImportError:
+    # Python 2
+    from distutils.spawn import find_executable as which
 
-def find_binary():
+
+def find_binary(output_dir):
     """ Returns the path to the generated binary and pdb file """
 
     source_file = None
@@ -22,43 +32,105 @@ def find_binary():
         configurations = ["RelWithDebInfo", "Release"]
         target_file = MODULE_NAME + ".pyd"
 
+        # Upstream modules of a workspace are built as .pyd directly
         for config in configurations:
-            possible_files.append(join(get_output_dir(), config, MODULE_NAME + ".dll"))
+            possible_files.append(join(output_dir, config, MODULE_NAME + ".dll"))
+            possible_files.append(join(output_dir, config, MODULE_NAME + ".pyd"))
 
     else:
         target_file = MODULE_NAME + ".so"
-        possible_files.append(join(get_output_dir(), target_file))
+        possible_files.append(join(output_dir, target_file))
 
     for file in possible_files:
         if isfile(file):
             source_file = file
 
-            pdb_name = file.replace(".so", ".pdb").replace(".dll", ".pdb")
+            pdb_name = file.replace(".so", ".pdb").replace(".dll", ".pdb").replace(".pyd", ".pdb")
             if isfile(pdb_name):
                 pdb_file = pdb_name
 
     return source_file, pdb_file, target_file
 
+
+def has_debug_info(fname):
+    """ Returns whether the given binary is an ELF file with debug information """
+    with open(fname, "rb") as handle:
+        data = handle.read()
+    return data[:4] == b"\x7fELF" and ELFInfo(data).has_debug_info()
+
+
+def split_debug_info(source_file, dest_file, debug_file):
+    """ Copies the binary to dest_file without its debug information, which
+    gets written to debug_file instead. The binary references the debug file
+    with a debuglink, so debuggers and profilers still resolve the symbols """
+    try_execute("objcopy", "--only-keep-debug", source_file, debug_file)
+    try_execute("objcopy", "--strip-debug", "--add-gnu-debuglink=" + debug_file, source_file, dest_file)
+
+    # With -gsplit-dwarf most of the debug information is in the .dwo files
+    # of the output directory, package them so they can be shipped as well.
+    # The binutils dwp does not support DWARF 5, so prefer llvm-dwp.
+    dwp = which("llvm-dwp") or which("dwp")
+    if not dwp:
+        print_error("WARNING: 'dwp' not found, the .dwo files stay in the output directory")
+        return
+    try:
+        try_execute(dwp, "-e", source_file, "-o", dest_file + ".dwp")
+    except Exception:
+        try_remove(dest_file + ".dwp")
+        print_error("WARNING: Packaging the .dwo files failed, they stay in the output directory")
+
+
 if __name__ == "__main__":
 
-    if len(sys.argv) != 2:
-        fatal_error("Usage: finalize.py <module-name>")
+    start = time.time()
+    FLAGS = sys.argv[2:]
+    OUTPUT_DIRS = [i[len("--output-dir="):] for i in FLAGS if i.startswith("--output-dir=")]
+    if len(sys.argv) < 2 or any(i not in ["--split-debug", "--memprofile"] for i in FLAGS
+                                if not i.startswith("--output-dir=")):
+        fatal_error("Usage: finalize.py <module-name> [--split-debug] [--memprofile] [--output-dir=DIR]")
 
     MODULE_NAME = sys.argv[1]
-    source_file, pdb_file, target_file = find_binary()
+    SPLIT_DEBUG = "--split-debug" in FLAGS
+    MEMPROFILE = "--memprofile" in FLAGS
+
+    # The build directory, which is a subfolder of the output dir for workspace builds
+    OUTPUT_DIR = OUTPUT_DIRS[0] if OUTPUT_DIRS else get_output_dir(MEMPROFILE)
+    source_file, pdb_file, target_file = find_binary(OUTPUT_DIR)
     target_pdb_file = MODULE_NAME + ".pdb"
 
     if source_file:
         dest_folder = join(get_script_dir(), "../")
 
-        # Copy the generated DLL
-        copyfile(source_file, join(dest_folder, target_file))
+        # The memory profiling build goes into a subfolder, so it does not
+        # replace the regular module
+        if MEMPROFILE:
+            dest_folder = join(dest_folder, "memprofile")
+            try_makedir(dest_folder)
+
+        # Copy the generated DLL, on linux optionally without debug information
+        debug_file = join(dest_folder, MODULE_NAME + ".debug")
+        try_remove(debug_file)
+        try_remove(join(dest_folder, target_file + ".dwp"))
+        split_debug = SPLIT_DEBUG and not is_windows() and not is_macos()
+        if split_debug and has_debug_info(source_file):
+            split_debug_info(source_file, join(dest_folder, target_file), debug_file)
+        else:
+            if split_debug:
+                # The linker already removed it with strip_binary=1
+                print_error("WARNING: The module has no debug information, it was probably stripped. "
+                            "Disable strip_binary to get a .debug file.")
+            copyfile(source_file, join(dest_folder, target_file))
 
         # Copy the generated PDB (if it was generated)
         if pdb_file:
             copyfile(pdb_file, join(dest_folder, target_pdb_file))
 
+        print_binary_report(join(dest_folder, target_file))
+
     else:
         fatal_error("Failed to find generated binary!")
 
+    # Copying, splitting the debug information and the report are part of
+    # every build, so they show up in the build timings as well
+    record_timing(join(OUTPUT_DIR, TIMINGS_FILE), "finalize", start, time.time())
     sys.exit(0)
@@ -6,22 +6,59 @@ Runs the interrogate and interrogate_module commands from Panda3D.
 """
 
 import sys
-from os import listdir, chdir
-from os.path import join, isfile, isdir
+import time
+from os import listdir, chdir, getcwd
+from os.path import join, isfile, isdir, relpath, abspath
 import re
 
 from panda3d.core import PandaSystem
 from common import debug_out, get_panda_bin_path, get_panda_include_path
 from common import get_compiler_name, is_64_bit, try_execute, join_abs, get_script_dir
+from common import record_timing, TIMINGS_FILE
 
-if len(sys.argv) != 3:
-    debug_out("Usage: python interrogate.py <module-name> <verbose-level>")
+# Flags are passed as --flag, everything else is positional
+FLAGS = [i for i in sys.argv[1:] if i.startswith("--")]
+ARGS = [i for i in sys.argv[1:] if not i.startswith("--")]
+
+if len(ARGS) not in [2, 3]:
+    debug_out("Usage: python interrogate.py <module-name> <verbose-level> [interrogate|module] "
+              "[--instrument] [--source-dir=DIR] [--output-dir=DIR] [--import=MODULE] [--include=DIR]")
     sys.exit(1)
 
 
+def get_flag_values(name):
+    """ Returns all values passed as --name=value """
+    prefix = "--" + name + "="
+    return [i[len(prefix):] for i in FLAGS if i.startswith(prefix)]
+
+
 # Parameters
-MODULE_NAME = sys.argv[1]
-VERBOSE_LVL = int(sys.argv[2])  # Assume the user did specify something valid
+MODULE_NAME = ARGS[0]
+VERBOSE_LVL = int(ARGS[1])  # Assume the user did specify something valid
+
+# Which step to run. CMake runs both steps as seperate commands, so the
+# wrapper can already compile while interrogate_module is still running
+STEP = ARGS[2] if len(ARGS) == 3 else "all"
+
+# Whether to instrument the generated bindings, see binding_stats/binding_stats.h
+INSTRUMENT = "--instrument" in FLAGS
+BINDING_STATS_DIR = join(get_script_dir(), "binding_stats")
+
+# Source root of the module, and the modules it depends on in a workspace build
+SOURCE_DIR = (get_flag_values("source-dir") or [join(get_script_dir(), "../source/")])[0]
+IMPORT_MODULES = get_flag_values("import")
+
+# Where the generated sources are written to. CMake passes the build directory,
+# so they are regenerated for every output directory
+OUTPUT_DIR = abspath((get_flag_values("output-dir") or [SOURCE_DIR])[0])
+WRAPPER_FILE = join(OUTPUT_DIR, "interrogate_wrapper.cpp")
+MODULE_FILE = join(OUTPUT_DIR, "interrogate_module.cpp")
+DATABASE_FILE = join(OUTPUT_DIR, "interrogate.in")
+INCLUDE_DIRS = get_flag_values("include")
+
+# Timings are written to the directory we got invoked from, which is the
+# output directory when running from CMake
+TIMINGS_PATH = join(getcwd(), TIMINGS_FILE)
 
 
 def check_ignore(source):
@@ -48,11 +85,30 @@ def find_sources(base_dir):
     return sources
 
 
+def get_include_dirs(root):
+    """ Returns the source root and two levels of subdirectories, the same
+    directories the include_source_dirs macro in the CMakeLists.txt adds """
+    include_dirs = [root]
+    for pth in listdir(root):
+        if isdir(join(root, pth)):
+            include_dirs.append(join(root, pth))
+            for sub_pth in listdir(join(root, pth)):
+                if isdir(join(root, pth, sub_pth)):
+                    include_dirs.append(join(root, pth, sub_pth))
+    return include_dirs
+
+
 def interrogate():
     """ Runs interrogate over the source directory """
 
     # Collect source files and convert them to a relative path
+    start = time.time()
     all_sources = find_sources(".")
+    record_timing(TIMINGS_PATH, "find_sources", start, time.time())
+
+    if INSTRUMENT:
+        # Publishes the functions to query the call counts
+        all_sources.append(relpath(join(BINDING_STATS_DIR, "binding_stats.h")))
 
     # Create the interrogate command
     cmd = [join(get_panda_bin_path(), 'interrogate')]
@@ -67,13 +123,19 @@ def interrogate():
     cmd += ["-S" + get_panda_include_path() + "/"]
 
     # Add all subdirectories
-    for pth in listdir("."):
-        if isdir(pth):
-            cmd += ["-I" + pth]
+    cmd += ["-I" + pth for pth in get_include_dirs(".")[1:]]
+
+    # Headers of upstream modules, their types are imported instead of
+    # being wrapped again
+    for include_dir in INCLUDE_DIRS:
+        cmd += ["-I" + pth for pth in get_include_dirs(include_dir)]
+
+    if INSTRUMENT:
+        cmd += ["-I" + relpath(BINDING_STATS_DIR)]
 
     cmd += ["-srcdir", "."]
-    cmd += ["-oc", "interrogate_wrapper.cpp"]
-    cmd += ["-od", "interrogate.in"]
+    cmd += ["-oc", WRAPPER_FILE]
+    cmd += ["-od", DATABASE_FILE]
     cmd += ["-module", MODULE_NAME]
     cmd += ["-library", MODULE_NAME]
 
@@ -107,7 +169,79 @@ def interrogate():
         cmd += ["-D" + define]
 
     cmd += all_sources
+    start = time.time()
     try_execute(*cmd)
+    record_timing(TIMINGS_PATH, "interrogate", start, time.time())
+
+    if INSTRUMENT:
+        start = time.time()
+        instrument_wrapper(WRAPPER_FILE)
+        record_timing(TIMINGS_PATH, "instrument", start, time.time())
+
+
+def get_binding_name(signature, func_name):
+    """ Returns a readable name for a generated wrapper, taken from the C++
+    signature interrogate writes above it, e.g. ExampleClass.get_answer,
+    ExampleClass.__init__ or a_free_function. Falls back to the name of the
+    wrapper function if there is no signature """
+    match = re.search(r'([\w:]+)\s*\(', signature or "")
+    if not match:
+        name = re.sub(r'_\d+$', '', func_name)
+        if name.startswith("Init_"):
+            name = name[len("Init_"):] + ".__init__"
+        return name
+    parts = [i for i in match.group(1).split("::") if i]
+    if len(parts) >= 2 and parts[-1] == parts[-2]:
+        parts[-1] = "__init__"
+    return ".".join(parts)
+
+
+def instrument_wrapper(wrapper_file):
+    """ Inserts a PB_BINDING_SCOPE into every generated function wrapper and
+    constructor, and registers the names of all wrappers. Getters, setters
+    and the internal conversion functions have a different signature and are
+    not instrumented """
+    wrapper_re = re.compile(
+        r'^static (PyObject \*|int )Dtool_(\w+)\(PyObject \*\w*, PyObject \*\w*(, PyObject \*\w*)?\) \{$')
+
+    with open(wrapper_file, "r") as handle:
+        lines = handle.readlines()
+
+    names = []
+    signature = None
+    expect_signature = False
+    output = ['#include "binding_stats.h"\n']
+    for line in lines:
+        output.append(line)
+
+        # Interrogate writes the wrapped C++ signatures into a comment above
+        # each wrapper, the first one is used to name the binding
+        if "Python function wrapper for:" in line:
+            expect_signature = True
+            continue
+        if expect_signature:
+            signature = line.strip().lstrip("*").strip()
+            expect_signature = False
+            continue
+
+        match = wrapper_re.match(line.rstrip())
+        if match:
+            output.append("  PB_BINDING_SCOPE({});\n".format(len(names)))
+            names.append(MODULE_NAME + ":" + get_binding_name(signature, match.group(2)))
+        if line.startswith("}"):
+            signature = None
+
+    output.append("\nstatic const char *const pb_binding_names[] = {\n")
+    output += ['  "{}",\n'.format(name) for name in names]
+    output.append("  nullptr\n};\n")
+    output.append("static struct PBBindingRegistrar {\n")
+    output.append("  PBBindingRegistrar() {{ BindingStats::register_bindings(pb_binding_names, {}); }}\n".format(len(names)))
+    output.append("} pb_binding_registrar;\n")
+
+    with open(wrapper_file, "w") as handle:
+        handle.writelines(output)
+
+    debug_out("Instrumented", len(names), "bindings")
 
 
 def interrogate_module():
@@ -120,21 +254,36 @@ def interrogate_module():
     if PandaSystem.get_major_version() > 1 or PandaSystem.get_minor_version() > 9:
         # Older panda3d versions don't have this
         cmd += ["-import", "panda3d.core"]
+        for module in IMPORT_MODULES:
+            cmd += ["-import", module]
 
     cmd += ["-module", MODULE_NAME]
     cmd += ["-library", MODULE_NAME]
-    cmd += ["-oc", "interrogate_module.cpp"]
-    cmd += ["interrogate.in"]
+    cmd += ["-oc", MODULE_FILE]
+    cmd += [DATABASE_FILE]
 
     try_execute(*cmd)
 
+def run_timed(name, func):
+    """ Runs the given step and records how long it took """
+    start = time.time()
+    func()
+    record_timing(TIMINGS_PATH, name, start, time.time())
+
+
 if __name__ == "__main__":
 
+    if STEP not in ["all", "interrogate", "module"]:
+        debug_out("Unknown step:", STEP)
+        sys.exit(1)
+
     # Change into the source directory
-    source_dir = join(get_script_dir(), "../source/")
-    chdir(source_dir)
+    chdir(SOURCE_DIR)
 
-    interrogate()
-    interrogate_module()
+    if STEP in ["all", "interrogate"]:
+        # Records the time of finding the sources and of interrogate itself
+        interrogate()
+    if STEP in ["all", "module"]:
+        run_timed("interrogate_module", interrogate_module)
 
     sys.exit(0)
@@ -0,0 +1,105 @@
+"""
+
+Helpers to inspect the memory usage of a module built with --memprofile.
+
+Panda3D only tracks allocations when track-memory-usage is enabled before
+panda3d.core is imported, e.g.:
+
+    from panda3d.core import load_prc_file_data
+    load_prc_file_data("", "track-memory-usage 1")
+
+Snapshots can then be taken from the running process and compared:
+
+    from scripts import memprofile
+    before = memprofile.take_snapshot()
+    ...
+    memprofile.print_comparison(before, memprofile.take_snapshot())
+
+Snapshots written with save_snapshot can be compared with:
+
+    python memprofile.py <old-snapshot.json> <new-snapshot.json>
+
+"""
+
+from __future__ import print_function
+
+import sys
+import json
+
+
+def take_snapshot():
+    """ Returns a dict of type name to the amount of live objects and the
+    bytes allocated for that type. The bytes are only known for types which
+    allocate through Panda's memory hooks (ALLOC_DELETED_CHAIN, ALLOC_MEMORY_BASE
+    and the like), and are 0 otherwise """
+    from panda3d.core import MemoryUsage, MemoryUsagePointers, TypeHandle
+
+    if not MemoryUsage.is_tracking():
+        raise RuntimeError("Memory usage is not tracked, set track-memory-usage "
+                           "before importing panda3d.core")
+
+    pointers = MemoryUsagePointers()
+    MemoryUsage.get_pointers(pointers)
+
+    snapshot = {}
+    types = {}
+    for i in range(pointers.get_num_pointers()):
+        type_name = pointers.get_type_name(i)
+        entry = snapshot.setdefault(type_name, {"count": 0, "bytes": 0})
+        entry["count"] += 1
+        types[type_name] = pointers.get_type(i)
+
+    for type_name, handle in types.items():
+        if handle != TypeHandle.none():
+            snapshot[type_name]["bytes"] = sum(handle.get_memory_usage(i) for i in [
+                TypeHandle.MC_singleton, TypeHandle.MC_array, TypeHandle.MC_deleted_chain_active])
+    return snapshot
+
+
+def save_snapshot(snapshot, fname):
+    """ Writes the snapshot to a json file """
+    with open(fname, "w") as handle:
+        json.dump(snapshot, handle, indent=2, sort_keys=True)
+
+
+def load_snapshot(fname):
+    """ Reads a snapshot written by save_snapshot """
+    with open(fname, "r") as handle:
+        return json.load(handle)
+
+
+def compare_snapshots(old, new):
+    """ Returns a list of (type name, count delta, bytes delta), sorted by
+    the growth in objects """
+    result = []
+    for type_name in set(old) | set(new):
+        old_entry = old.get(type_name, {"count": 0, "bytes": 0})
+        new_entry = new.get(type_name, {"count": 0, "bytes": 0})
+        result.append((type_name, new_entry["count"] - old_entry["count"],
+                       new_entry["bytes"] - old_entry["bytes"]))
+    return sorted(result, key=lambda i: (-i[1], -i[2], i[0]))
+
+
+def print_snapshot(snapshot):
+    """ Prints the live objects and bytes by type """
+    print("{:<50}{:>12}{:>14}".format("Type", "Objects", "Bytes"))
+    for type_name, entry in sorted(snapshot.items(), key=lambda i: -i[1]["count"]):
+        print("{:<50}{:>12}{:>14}".format(type_name, entry["count"], entry["bytes"]))
+
+
+def print_comparison(old, new):
+    """ Prints the types which changed between two snapshots """
+    print("{:<50}{:>12}{:>14}".format("Type", "Objects", "Bytes"))
+    for type_name, count_delta, bytes_delta in compare_snapshots(old, new):
+        if count_delta or bytes_delta:
+            print("{:<50}{:>+12}{:>+14}".format(type_name, count_delta, bytes_delta))
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) != 3:
+        print("Usage: python memprofile.py <old-snapshot.json> <new-snapshot.json>")
+        sys.exit(1)
+
+    print_comparison(load_snapshot(sys.argv[1]), load_snapshot(sys.argv[2]))
+    sys.exit(0)
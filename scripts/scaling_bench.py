@@ -0,0 +1,192 @@
+"""
+
+Measures how the module builder scales with the size of a module. Generates
+synthetic source trees and runs a full build, a no-op build and a build after
+touching a single header for each size, recording the time spent in the
+different build steps.
+
+Usage: python scripts/scaling_bench.py [--sizes=10,50,100] [--classes=4]
+           [--methods=8] [--fanout=2] [--output=scaling_results.json]
+           [--baseline=old_results.json] [--threshold=20]
+
+With --baseline, the total times are compared against a previous run, and the
+script fails if any build got slower by more than the threshold (in percent).
+
+"""
+
+from __future__ import print_function
+
+# Important: import panda3d as the very first library - otherwise it crashes
+import panda3d.core  # noqa
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from os.path import join, realpath, dirname, isfile, isdir
+
+sys.path.insert(0, join(dirname(realpath(__file__)), ".."))
+
+from scripts.common import get_basepath, get_ini_conf, read_timing_spans, try_makedir, TIMINGS_FILE  # noqa
+from scripts.workspace import WorkspaceModule, build_module, get_module_output_dir  # noqa
+
+# Steps which are reported, in the order they happen
+STEPS = ["configure", "find_sources", "interrogate", "interrogate_module", "compile", "link"]
+
+# Build variants which are measured for each size
+VARIANTS = ["full", "noop", "touch"]
+
+
+def generate_header(index, num_classes, num_methods, fanout):
+    """ Returns the contents of a synthetic header, which includes the
+    previous fanout headers """
+    lines = ["#ifndef SYNTH_{0}_H".format(index), "#define SYNTH_{0}_H".format(index), "",
+             '#include "pandabase.h"']
+    lines += ['#include "synth_{0}.h"'.format(i) for i in range(max(0, index - fanout), index)]
+    lines += [""]
+
+    for cls in range(num_classes):
+        lines += ["class Synth{0}_{1} {{".format(index, cls), "PUBLISHED:"]
+        lines += ["  Synth{0}_{1}();".format(index, cls)]
+        lines += ["  int method_{0}(int value) const;".format(i) for i in range(num_methods)]
+        lines += ["", "private:", "  int _value;", "};", ""]
+
+    lines += ["#endif", ""]
+    return "\n".join(lines)
+
+
+def generate_source(index, num_classes, num_methods):
+    """ Returns the implementation of a synthetic header """
+    lines = ['#include "synth_{0}.h"'.format(index), ""]
+    for cls in range(num_classes):
+        name = "Synth{0}_{1}".format(index, cls)
+        lines += ["{0}::\n{0}() : _value({1}) {{\n}}\n".format(name, cls)]
+        for i in range(num_methods):
+            lines += ["int {0}::\nmethod_{1}(int value) const {{\n  return value * _value + {1};\n}}\n".format(name, i)]
+    return "\n".join(lines)
+
+
+def generate_tree(source_dir, num_headers, num_classes, num_methods, fanout):
+    """ Writes a synthetic source tree with the given amount of headers """
+    if isdir(source_dir):
+        shutil.rmtree(source_dir)
+    try_makedir(source_dir)
+    for index in range(num_headers):
+        with open(join(source_dir, "synth_{0}.h".format(index)), "w") as handle:
+            handle.write(generate_header(index, num_classes, num_methods, fanout))
+        with open(join(source_dir, "synth_{0}.cpp".format(index)), "w") as handle:
+            handle.write(generate_source(index, num_classes, num_methods))
+
+
+def collect_steps(timings_file, configure_time):
+    """ Sums up the recorded build steps. Compile happens in parallel, so its
+    time is the span from the first to the last compile """
+    steps = {"configure": configure_time}
+    spans = {}
+    for name, start, end in read_timing_spans(timings_file):
+        first, last = spans.get(name, (start, end))
+        spans[name] = (min(first, start), max(last, end))
+    for name, (start, end) in spans.items():
+        steps[name] = end - start
+    return steps
+
+
+def run_variant(config, module, size, variant):
+    """ Builds the synthetic module once, returns the measured step times """
+    build_args = argparse.Namespace(optimize=None, memprofile=False, clean=(variant == "full"))
+    timings_file = join(get_module_output_dir(build_args, module.name), TIMINGS_FILE)
+
+    if variant == "touch":
+        # Only update the timestamp of the first header
+        os.utime(join(module.source_dir, "synth_0.h"), None)
+
+    start = time.time()
+    configure_time, _, _ = build_module(config, build_args, {module.name: module}, module.name, False,
+                                        extra_args=["-DTIME_BUILD_STEPS=TRUE"])
+    result = {"headers": size, "variant": variant, "total": time.time() - start}
+    result.update(collect_steps(timings_file, configure_time))
+    return result
+
+
+def print_table(results):
+    """ Prints the results as a table """
+    header = "{:>8} {:<6}{:>9}".format("headers", "build", "total")
+    header += "".join("{:>20}".format(step) for step in STEPS)
+    print("\n" + header)
+    for result in results:
+        line = "{:>8} {:<6}{:>8.2f}s".format(result["headers"], result["variant"], result["total"])
+        line += "".join("{:>19.2f}s".format(result[step]) if step in result else "{:>20}".format("-")
+                        for step in STEPS)
+        print(line)
+
+
+def compare_to_baseline(results, baseline_file, threshold):
+    """ Prints the change of the total build times compared to a previous run,
+    returns whether any of them got slower than the threshold allows """
+    with open(baseline_file, "r") as handle:
+        baseline = {(i["headers"], i["variant"]): i for i in json.load(handle)["results"]}
+
+    regressed = False
+    print("\nCompared to", baseline_file + ":")
+    for result in results:
+        old = baseline.get((result["headers"], result["variant"]))
+        if not old or old["total"] <= 0:
+            continue
+        change = (result["total"] - old["total"]) / old["total"] * 100.0
+        marker = ""
+        if change > threshold:
+            marker = "  <-- REGRESSION"
+            regressed = True
+        print("{:>8} {:<6}{:>8.2f}s -> {:>8.2f}s {:>+8.1f}%{}".format(
+            result["headers"], result["variant"], old["total"], result["total"], change, marker))
+    return regressed
+
+
+def cleanup_binaries(name):
+    """ Removes the synthetic module which finalize.py copied next to the builder """
+    for suffix in [".so", ".pyd", ".pdb", ".debug", ".so.dwp"]:
+        fname = join(get_basepath(), name + suffix)
+        if isfile(fname):
+            os.remove(fname)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Measures the scaling of the module builder")
+    parser.add_argument("--sizes", default="10,50,100", help="Comma seperated amounts of headers")
+    parser.add_argument("--classes", type=int, default=4, help="Classes per header")
+    parser.add_argument("--methods", type=int, default=8, help="Published methods per class")
+    parser.add_argument("--fanout", type=int, default=2, help="Headers included by each header")
+    parser.add_argument("--output", default="scaling_results.json", help="File to write the results to")
+    parser.add_argument("--baseline", default=None, help="Previous results to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed slowdown in percent")
+    args = parser.parse_args()
+
+    # Use the settings of the config.ini, but a synthetic module
+    config = get_ini_conf(join(get_basepath(), "config.ini"))
+    config.setdefault("generate_pdb", "0")
+    results = []
+
+    for size in [int(i) for i in args.sizes.split(",")]:
+        name = "ScalingBench{0}".format(size)
+        module = WorkspaceModule(name, realpath(join(get_basepath(), "scaling_bench", name)), [])
+        generate_tree(module.source_dir, size, args.classes, args.methods, args.fanout)
+
+        for variant in VARIANTS:
+            results.append(run_variant(config, module, size, variant))
+
+        cleanup_binaries(name)
+
+    print_table(results)
+
+    settings = {"classes": args.classes, "methods": args.methods, "fanout": args.fanout}
+    with open(args.output, "w") as handle:
+        json.dump({"settings": settings, "results": results}, handle, indent=2)
+    print("\nWrote results to", args.output)
+
+    if args.baseline and compare_to_baseline(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+    sys.exit(0)
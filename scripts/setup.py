@@ -1,9 +1,10 @@
 
 import shutil
 import sys
+import os
 import multiprocessing
 from os import chdir, _exit
-from os.path import isdir, isfile
+from os.path import isdir, isfile, join
 from panda3d.core import PandaSystem
 
 from .common import get_output_dir, try_makedir, fatal_error, is_windows
@@ -11,13 +12,14 @@ from .common import is_linux, join_abs, get_panda_lib_path, is_64_bit
 from .common import try_execute, get_script_dir, get_panda_msvc_version
 from .common import have_eigen, have_bullet, have_freetype, print_error
 from .common import is_macos, is_freebsd, is_installed_via_pip
-from .common import get_win_thirdparty_dir
+from .common import get_win_thirdparty_dir, debug_out, read_timings
+from .common import TIMINGS_FILE, get_panda_bin_path
 
 
-def make_output_dir(clean=False):
+def make_output_dir(clean=False, memprofile=False):
     """ Creates the output directory and sets the CWD into that directory. If
     clean is True, the output dir will be cleaned up. """
-    output_dir = get_output_dir()
+    output_dir = get_output_dir(memprofile)
 
     # Cleanup output directory in case clean is specified
     if isdir(output_dir) and clean:
@@ -55,12 +57,19 @@ def handle_cmake_error(output):
     exit(-1)
 
 
-def run_cmake(config, args):
-    """ Runs cmake in the output dir """
-
-    configuration = "Release"
+def get_build_configuration(config):
+    """ Returns the CMake configuration to build, depending on whether a pdb
+    should be generated """
     if config["generate_pdb"].lower() in ["1", "true", "yes", "y"]:
-        configuration = "RelWithDebInfo"
+        return "RelWithDebInfo"
+    return "Release"
+
+
+def run_cmake(config, args, extra_args=None, cwd=None):
+    """ Runs cmake in the output dir, or in cwd if specified. extra_args are
+    additional arguments for cmake, used by workspace builds """
+
+    configuration = get_build_configuration(config)
 
     cmake_args = ["-DCMAKE_BUILD_TYPE=" + configuration]
     cmake_args += ["-DPYTHON_EXECUTABLE:STRING=" + sys.executable]
@@ -108,6 +117,9 @@ def run_cmake(config, args):
     else:
         cmake_args += ["-DTHIRDPARTY_WIN_DIR="]
 
+    def is_enabled(option, default="0"):
+        return config.get(option, default).lower() in ["1", "true", "yes", "y"]
+
     # Libraries
     def is_required(lib):
         if "require_lib_" + lib in config and config["require_lib_" + lib] in ["1", "yes", "y"]:
@@ -150,15 +162,55 @@ def run_cmake(config, args):
 
     cmake_args += ["-DOPTIMIZE=" + str(optimize)]
 
-    output = try_execute("cmake", join_abs(get_script_dir(), ".."), *cmake_args, error_formatter=handle_cmake_error)
+    # Debug information on Linux and macOS, off by default since it makes
+    # the build slower. When enabled, it is split into a seperate file by default.
+    if is_enabled("debug_info"):
+        cmake_args += ["-DGENERATE_DEBUG_INFO=TRUE"]
+    else:
+        cmake_args += ["-DGENERATE_DEBUG_INFO=FALSE"]
+
+    if is_enabled("split_debug_info", default="1"):
+        cmake_args += ["-DSPLIT_DEBUG_INFO=TRUE"]
+    else:
+        cmake_args += ["-DSPLIT_DEBUG_INFO=FALSE"]
+
+    # Lean binaries, off by default
+    if is_enabled("lean_binary"):
+        cmake_args += ["-DLEAN_BINARY=TRUE"]
+    else:
+        cmake_args += ["-DLEAN_BINARY=FALSE"]
+
+    if is_enabled("strip_binary"):
+        cmake_args += ["-DSTRIP_BINARY=TRUE"]
+    else:
+        cmake_args += ["-DSTRIP_BINARY=FALSE"]
+
+    # Memory profiling build, see scripts/memprofile.py
+    if args.memprofile:
+        cmake_args += ["-DMEMPROFILE=TRUE"]
+    else:
+        cmake_args += ["-DMEMPROFILE=FALSE"]
+
+    # Binding instrumentation, off by default
+    if is_enabled("instrument_bindings"):
+        cmake_args += ["-DINSTRUMENT_BINDINGS=TRUE"]
+    else:
+        cmake_args += ["-DINSTRUMENT_BINDINGS=FALSE"]
+
+    # Native benchmarks from bench/, workspace builds switch them off again
+    # with their extra arguments
+    cmake_args += ["-DBUILD_BENCH=TRUE"]
+
+    cmake_args += extra_args or []
 
+    output = try_execute("cmake", join_abs(get_script_dir(), ".."), *cmake_args,
+                         error_formatter=handle_cmake_error, cwd=cwd)
 
-def run_cmake_build(config, args):
+
+def run_cmake_build(config, args, cwd=None):
     """ Runs the cmake build which builds the final output """
 
-    configuration = "Release"
-    if config["generate_pdb"].lower() in ["1", "true", "yes", "y"]:
-        configuration = "RelWithDebInfo"
+    configuration = get_build_configuration(config)
 
     # get number of cores, leave one for the system though
     num_cores = max(1, multiprocessing.cpu_count() - 1)
@@ -171,4 +223,67 @@ def run_cmake_build(config, args):
         # Specifying no cpu count makes MSBuild use all available ones
         core_option = "/m"
 
-    try_execute("cmake", "--build", ".", "--config", configuration, "--", core_option)
+    try_execute("cmake", "--build", ".", "--config", configuration, "--", core_option, cwd=cwd)
+
+
+def run_cpp_bench(config, args, output_file):
+    """ Runs the native benchmark executable built from bench/*.cpp and writes
+    the results as json to the given file """
+    bench_name = config["module_name"] + "_bench"
+    output_dir = get_output_dir(args.memprofile)
+    if is_windows():
+        bench_binary = join(output_dir, get_build_configuration(config), bench_name + ".exe")
+        # The panda3d dlls have to be found when launching the executable
+        os.environ["PATH"] = get_panda_bin_path() + os.pathsep + os.environ.get("PATH", "")
+    else:
+        bench_binary = join(output_dir, bench_name)
+
+    if not isfile(bench_binary):
+        fatal_error("No benchmark executable found at", bench_binary,
+                    "- make sure there are benchmark sources in bench/")
+
+    try_execute(bench_binary, "--json", output_file)
+    debug_out("Wrote benchmark results to", output_file)
+
+
+def print_build_timings(configure_time, build_start, build_end, timings_file=TIMINGS_FILE, title="Build timings"):
+    """ Prints how long the different build steps took, including the
+    critical path through either interrogate or the user sources """
+    timings = read_timings(timings_file)
+
+    debug_out("\n" + title + ":")
+    debug_out("  {:<28}{:>8.2f}s".format("configure", configure_time))
+    debug_out("  {:<28}{:>8.2f}s".format("build (total)", build_end - build_start))
+
+    for step in ["find_sources", "interrogate", "instrument", "interrogate_module", "finalize"]:
+        if step in timings:
+            start, end = timings[step]
+            debug_out("  {:<28}{:>8.2f}s".format(step, end - start))
+
+    # Both are written by every build, unless it failed
+    if "objects" not in timings or "finalize" not in timings:
+        return
+
+    # The module target waits for the user sources and for interrogate, the
+    # later of both is the point where compiling the wrapper and linking
+    # starts. Interrogate does not run if no header changed.
+    objects_end = timings["objects"][1]
+    chains = [("user sources", build_start, objects_end)]
+    if "interrogate_module" in timings:
+        first_step = [i for i in ["find_sources", "interrogate", "interrogate_module"] if i in timings][0]
+        igate_start = timings[first_step][0]
+        chains.append(("interrogate", igate_start, timings["interrogate_module"][1]))
+
+    name, chain_start, join_point = max(chains, key=lambda i: i[2])
+    finalize_start, finalize_end = timings["finalize"]
+
+    debug_out("\nCritical path (" + name + "):")
+    if chain_start > build_start:
+        debug_out("  {:<28}{:>8.2f}s".format("wait for " + name, chain_start - build_start))
+    debug_out("  {:<28}{:>8.2f}s".format(name, join_point - chain_start))
+    debug_out("  {:<28}{:>8.2f}s".format("compile wrapper + link", max(0.0, finalize_start - join_point)))
+    debug_out("  {:<28}{:>8.2f}s".format("finalize", finalize_end - finalize_start))
+
+    # E.g. the benchmark executable, which links after the module
+    if build_end - finalize_end > 0.01:
+        debug_out("  {:<28}{:>8.2f}s".format("other targets", build_end - finalize_end))
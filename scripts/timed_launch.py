@@ -0,0 +1,28 @@
+"""
+
+Launcher for the compile and link rules, used when TIME_BUILD_STEPS is set.
+Runs the given command and records how long it took. Without a command, only
+the current time is recorded, which marks the end of a step like compiling
+the user sources.
+
+"""
+
+import sys
+import time
+import subprocess
+
+if len(sys.argv) < 3:
+    print("Usage: python timed_launch.py <timings-file> <step> [command...]")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+
+    start = time.time()
+    returncode = subprocess.call(sys.argv[3:]) if len(sys.argv) > 3 else 0
+
+    # Same format as common.record_timing, which is not imported because
+    # importing panda3d would slow down every single compile
+    with open(sys.argv[1], "a") as handle:
+        handle.write("{}={:.3f},{:.3f}\n".format(sys.argv[2], start, time.time()))
+    sys.exit(returncode)
@@ -0,0 +1,187 @@
+"""
+
+Workspace builds, which build several modules depending on each other. The
+modules are listed in the config.ini:
+
+    workspace=base,game
+    base.source=modules/base
+    game.source=modules/game
+    game.depends=base
+
+Each module is built into its own subfolder of the output directory, in
+dependency order. Modules whose dependencies are done get built in parallel.
+Dependents include the headers of their upstream modules, link against them
+and import them, so shared types are only compiled and registered once.
+
+"""
+
+from __future__ import print_function
+
+import shutil
+import threading
+import time
+from os.path import join, isdir
+
+from .common import get_basepath, get_output_dir, try_makedir, fatal_error
+from .common import join_abs, is_windows, try_remove, TIMINGS_FILE
+from .setup import run_cmake, run_cmake_build, get_build_configuration
+from .setup import print_build_timings
+
+
+class WorkspaceModule(object):
+    def __init__(self, name, source_dir, depends):
+        self.name = name
+        self.source_dir = source_dir
+        self.depends = depends
+
+
+def split_list(value):
+    """ Splits a comma seperated config value """
+    return [i.strip() for i in value.split(",") if i.strip()]
+
+
+def is_workspace(config):
+    """ Returns whether the config describes a workspace with several modules """
+    return bool(config.get("workspace", "").strip())
+
+
+def get_workspace_modules(config):
+    """ Returns a dict of module name to WorkspaceModule, as listed in the config """
+    modules = {}
+    for name in split_list(config["workspace"]):
+        source = config.get(name + ".source", "")
+        if not source:
+            fatal_error("No source directory for module '" + name + "', add " +
+                        name + ".source=<path> to the config.ini")
+
+        source_dir = join_abs(get_basepath(), source)
+        if not isdir(source_dir):
+            fatal_error("Source directory of module '" + name + "' does not exist:", source_dir)
+
+        modules[name] = WorkspaceModule(name, source_dir, split_list(config.get(name + ".depends", "")))
+
+    for module in modules.values():
+        for dependency in module.depends:
+            if dependency not in modules:
+                fatal_error("Module '" + module.name + "' depends on unknown module '" + dependency + "'")
+    return modules
+
+
+def sort_modules(modules):
+    """ Returns the module names in dependency order, fails on cyclic dependencies """
+    order = []
+    state = {}
+
+    def visit(name, stack):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            fatal_error("Cyclic module dependency:", " -> ".join(stack + [name]))
+        state[name] = "visiting"
+        for dependency in modules[name].depends:
+            visit(dependency, stack + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in sorted(modules):
+        visit(name, [])
+    return order
+
+
+def get_upstream_modules(modules, name):
+    """ Returns all modules the given module depends on, directly or indirectly,
+    in dependency order """
+    upstream = []
+    for dependency in modules[name].depends:
+        for upstream_name in get_upstream_modules(modules, dependency) + [dependency]:
+            if upstream_name not in upstream:
+                upstream.append(upstream_name)
+    return upstream
+
+
+def get_module_output_dir(args, name):
+    """ Returns the directory a module of the workspace is built in """
+    return join(get_output_dir(args.memprofile), name)
+
+
+def get_module_binary(config, args, name):
+    """ Returns the path of the built module which dependents link against """
+    output_dir = get_module_output_dir(args, name)
+    if is_windows():
+        return join(output_dir, get_build_configuration(config), name + ".lib")
+    return join(output_dir, name + ".so")
+
+
+def build_module(config, args, modules, name, has_dependents, extra_args=None):
+    """ Configures and builds a single module of the workspace, returns the
+    configure time and the start and end of the build """
+    output_dir = get_module_output_dir(args, name)
+    if isdir(output_dir) and args.clean:
+        shutil.rmtree(output_dir)
+    try_makedir(output_dir)
+    try_remove(join(output_dir, TIMINGS_FILE))
+
+    upstream = get_upstream_modules(modules, name)
+    extra_args = (extra_args or []) + [
+        "-DMODULE_SOURCE_DIR:STRING=" + modules[name].source_dir,
+        "-DUPSTREAM_MODULES:STRING=" + ";".join(upstream),
+        "-DUPSTREAM_SOURCE_DIRS:STRING=" + ";".join(modules[i].source_dir for i in upstream),
+        "-DUPSTREAM_BINARIES:STRING=" + ";".join(get_module_binary(config, args, i) for i in upstream),
+        "-DHAS_DEPENDENTS=" + ("TRUE" if has_dependents else "FALSE"),
+        "-DBUILD_BENCH=FALSE",
+    ]
+
+    module_config = dict(config)
+    module_config["module_name"] = name
+
+    configure_start = time.time()
+    run_cmake(module_config, args, extra_args, cwd=output_dir)
+    build_start = time.time()
+    run_cmake_build(module_config, args, cwd=output_dir)
+    return build_start - configure_start, build_start, time.time()
+
+
+def build_workspace(config, args):
+    """ Builds all modules of the workspace, starting each module as soon as
+    all of its dependencies are built """
+    modules = get_workspace_modules(config)
+    order = sort_modules(modules)
+    has_dependents = {name: any(name in modules[i].depends for i in modules) for name in modules}
+
+    done = set()
+    failed = []
+    running = set()
+    timings = {}
+    condition = threading.Condition()
+
+    def worker(name):
+        try:
+            timings[name] = build_module(config, args, modules, name, has_dependents[name])
+        except BaseException:
+            # try_execute exits on errors, which only ends this thread
+            failed.append(name)
+        with condition:
+            running.discard(name)
+            done.add(name)
+            condition.notify()
+
+    with condition:
+        while len(done) < len(order) and not failed:
+            for name in order:
+                if name in done or name in running:
+                    continue
+                if all(i in done for i in modules[name].depends):
+                    running.add(name)
+                    threading.Thread(target=worker, args=(name,)).start()
+            condition.wait()
+
+        # Let the remaining builds finish before reporting the error
+        while running:
+            condition.wait()
+
+    if failed:
+        fatal_error("Failed to build module(s):", ", ".join(failed))
+
+    for name in order:
+        print_build_timings(*timings[name], timings_file=join(get_module_output_dir(args, name), TIMINGS_FILE),
+                            title="Build timings of " + name)
@@ -10,10 +10,14 @@ Include all your dynamically typed classes here, e.g.
 
 #include "dconfig.h"
 
-Configure(config_mymodule);
-NotifyCategoryDef(mymodule , "");
+#ifdef PB_BINDING_STATS
+#include "binding_stats.h"
+#endif
 
-ConfigureFn(config_mymodule) {
+PB_CONFIGURE(config_mymodule);
+PB_NOTIFY_CATEGORY_DEF(PB_CFG_MODULE, "");
+
+PB_CONFIGURE_FN(config_mymodule) {
   init_libmymodule();
 }
 
@@ -28,6 +32,21 @@ init_libmymodule() {
   // Init your dynamic types here, e.g.:
   // MyDynamicClass::init_type();
 
+#ifdef PB_MEMPROFILE
+  // Set when building with --memprofile. Panda only tracks allocations when
+  // track-memory-usage is set before panda3d.core is imported.
+  if (!MemoryUsage::is_tracking()) {
+    mymodule_cat.warning()
+      << "Built for memory profiling, but track-memory-usage is not enabled\n";
+  }
+#endif
+
+#ifdef PB_BINDING_STATS
+  // Set when building with instrument_bindings=1
+  init_binding_stats();
+  mymodule_cat.info() << "Python bindings are instrumented with PStats collectors\n";
+#endif
+
   return;
 }
 
@@ -4,6 +4,36 @@
 
 #include "notifyCategoryProxy.h"
 
-NotifyCategoryDecl(mymodule, EXPORT_CLASS, EXPORT_TEMPL);
+// The notify category, the config and the init function are named after the
+// module (PB_CFG_MODULE is set to the module name by the CMakeLists.txt). When
+// several modules are loaded into the same process, e.g. in a workspace,
+// their symbols would otherwise collide. Use mymodule_cat, config_mymodule
+// and init_libmymodule to refer to them.
+#define PB_CONCAT_IMPL(a, b) a##b
+#define PB_CONCAT(a, b) PB_CONCAT_IMPL(a, b)
 
-extern void init_libmymodule();
+#define mymodule_cat PB_CONCAT(PB_CFG_MODULE, _cat)
+#define config_mymodule PB_CONCAT(config_, PB_CFG_MODULE)
+#define init_libmymodule PB_CONCAT(init_lib, PB_CFG_MODULE)
+
+// The arguments are expanded before NotifyCategoryDecl pastes them together
+#define PB_NOTIFY_CATEGORY_DECL(name) NotifyCategoryDecl(name, EXPORT_CLASS, EXPORT_TEMPL)
+#define PB_NOTIFY_CATEGORY_DEF(name, parent) NotifyCategoryDef(name, parent)
+#define PB_CONFIGURE(name) Configure(name)
+#define PB_CONFIGURE_FN(name) ConfigureFn(name)
+
+PB_NOTIFY_CATEGORY_DECL(PB_CFG_MODULE);
+
+// Counts an object under the given type in Panda's memory usage tracking,
+// when building with --memprofile. Objects of classes deriving from
+// TypedReferenceCount are already counted by their type, use this in the
+// constructor of other ReferenceCount classes, e.g.:
+// PB_MEMPROFILE_TRACK(this, MyClass::get_class_type());
+#ifdef PB_MEMPROFILE
+#include "memoryUsage.h"
+#define PB_MEMPROFILE_TRACK(ptr, type) MemoryUsage::update_type(ptr, type)
+#else
+#define PB_MEMPROFILE_TRACK(ptr, type)
+#endif
+
+extern EXPORT_CLASS void init_libmymodule();